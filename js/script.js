@@ -96,9 +96,10 @@ document
       const out = [];
       for (let file of files) {
         const arrayBuf = await file.arrayBuffer();
+        // Pass the raw bytes as a typed array rather than a per-byte JS array
         out.push({
           name: file.name,
-          data: Array.from(new Uint8Array(arrayBuf)),
+          data: new Uint8Array(arrayBuf),
         });
       }
       return out;
@@ -111,9 +112,12 @@ document
       "Processing...",
     );
 
+    // Files are read once and shared by prepare and finalize
+    let fileInfos;
     let prepareResult;
     try {
-      prepareResult = await window.prepare_files(await toFileInfos(files));
+      fileInfos = await toFileInfos(files);
+      prepareResult = await window.prepare_files(fileInfos);
     } catch (e) {
       hideProcessing(processingOverlay, processingModal);
       displayMessage("An error occurred during processing.", "error");
@@ -146,9 +150,10 @@ document
 
     try {
       const result = await window.finalize_files(
-        await toFileInfos(files),
+        fileInfos,
         grouping,
         proceed,
+        prepareResult.cache_key,
       );
       await completeProcessingAnimation(
         processingOverlay,
@@ -1,10 +1,19 @@
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl import Workbook, load_workbook
+from openpyxl.worksheet.table import Table, TableStyleInfo, TableColumn
+from openpyxl.cell import WriteOnlyCell
+from pandas.io.parsers import TextParser
 import io
+import hashlib
+import numbers
+import warnings
 from datetime import datetime
 from pyscript import ffi, window, document
 import re
+import sys
+from functools import lru_cache
+from operator import itemgetter
+from types import MappingProxyType
 from openpyxl.chart import ScatterChart, Reference, Series
 from openpyxl.chart.layout import Layout, ManualLayout
 from openpyxl.utils import get_column_letter
@@ -12,190 +21,246 @@ from openpyxl.utils import get_column_letter
 # Section: Configuration Class
 # Holds all configurable settings for columns, formats, and processing rules
 class ColumnConfig:
-    def __init__(self):
-        self.main_column = 'B'  # Main column to check for data presence
-        self.extract_columns = ['B', 'C', 'D', 'E', 'F', 'G', 'H', 'I']  # Columns to extract
-        self.validation_column = 'K'  # Column to validate for blanks in rows 4-6
-        self.key_map = {  # Mapping from column letters to data keys
-            'B': 'area',
-            'C': 'date',
-            'D': 'invoice_no',
-            'E': 'customer_name',
-            'F': 'product_type',
-            'G': 'product_name',
-            'H': 'quantity',
-            'I': 'unit_price'
-        }
-        self.output_headers = [  # Headers for the output sales sheet
-            'Area',
-            'Tanggal',
-            'Periode',
-            'No. Faktur',
-            'Customer',
-            'Jenis',
-            'Produk',
-            'Jumlah',
-            'Harga Satuan',
-            'Total (IDR)',
-            'Kurs',
-            'Total (USD)'
-        ]
-        self.preserve_upper_customer = {  # Words to keep uppercase for customers
-            'ABC',
-            'BAL',
-            'TSG'
-        }
-        self.preserve_upper_product = {  # Words to keep uppercase for products
-            'GMS',
-            'HVP',
-            'WCI',
-            'BBQ',
-            'KAN',
-            'MTO',
-            'CAI',
-            'CAP',
-            'SWS',
-            'BLD'
-        }
-        self.area_replacements = {  # Area abbreviations to full names
-            'Bdg': 'Bandung',
-            'Bgr': 'Bogor',
-            'Bks': 'Bekasi',
-            'Jkt': 'Jakarta',
-            'Lpg': 'Lampung',
-            'Mdn': 'Medan',
-            'Tgr': 'Tangerang'
-        }
-        self.idr_format_2 = r'_-"Rp"* #,##0.00_ ;_-"Rp"* -#,##0.00_ ;_-"Rp"* "-"??_ ;_-@_-'
-        self.idr_format_0 = r'_-"Rp"* #,##0_ ;_-"Rp"* -#,##0_ ;_-"Rp"* "-"??_ ;_-@_-'
-        self.usd_format_2 = r'_-"$"* #,##0.00_ ;_-"$"* -#,##0.00_ ;_-"$"* "-"??_ ;_-@_-'
+    # Settings are immutable class attributes, built once at import and shared by every instance
+    main_column = 'B'  # Main column to check for data presence
+    extract_columns = ('B', 'C', 'D', 'E', 'F', 'G', 'H', 'I')  # Columns to extract
+    validation_column = 'K'  # Column to validate for blanks in rows 4-6
+    key_map = MappingProxyType({  # Mapping from column letters to data keys
+        'B': 'area',
+        'C': 'date',
+        'D': 'invoice_no',
+        'E': 'customer_name',
+        'F': 'product_type',
+        'G': 'product_name',
+        'H': 'quantity',
+        'I': 'unit_price'
+    })
+    extract_keys = tuple(key_map.values())  # Data keys in extract_columns order
+    # Zero-based column indices, fixed at class creation
+    main_idx = ord(main_column) - ord('A')
+    extract_idxs = tuple(ord(col) - ord('A') for col in extract_columns)
+    validation_idx = ord(validation_column) - ord('A')
+    output_headers = (  # Headers for the output sales sheet
+        'Area',
+        'Tanggal',
+        'Periode',
+        'No. Faktur',
+        'Customer',
+        'Jenis',
+        'Produk',
+        'Jumlah',
+        'Harga Satuan',
+        'Total (IDR)',
+        'Kurs',
+        'Total (USD)'
+    )
+    preserve_upper_customer = frozenset({  # Words to keep uppercase for customers
+        'ABC',
+        'BAL',
+        'TSG'
+    })
+    preserve_upper_product = frozenset({  # Words to keep uppercase for products
+        'GMS',
+        'HVP',
+        'WCI',
+        'BBQ',
+        'KAN',
+        'MTO',
+        'CAI',
+        'CAP',
+        'SWS',
+        'BLD'
+    })
+    area_replacements = MappingProxyType({  # Area abbreviations to full names
+        'Bdg': 'Bandung',
+        'Bgr': 'Bogor',
+        'Bks': 'Bekasi',
+        'Jkt': 'Jakarta',
+        'Lpg': 'Lampung',
+        'Mdn': 'Medan',
+        'Tgr': 'Tangerang'
+    })
+    idr_format_2 = r'_-"Rp"* #,##0.00_ ;_-"Rp"* -#,##0.00_ ;_-"Rp"* "-"??_ ;_-@_-'
+    idr_format_0 = r'_-"Rp"* #,##0_ ;_-"Rp"* -#,##0_ ;_-"Rp"* "-"??_ ;_-@_-'
+    usd_format_2 = r'_-"$"* #,##0.00_ ;_-"$"* -#,##0.00_ ;_-"$"* "-"??_ ;_-@_-'
+
+# Shared read-only settings instance used by every call
+CONFIG = ColumnConfig()
 
 # Section: Utility Functions
 # Helper functions for data processing
-def col_to_index(col):
-    # Converts column letter to zero-based index
-    return ord(col.upper()) - ord('A')
-
-def proper_case(text, preserve_upper=set()):
+def file_bytes(data):
+    # Uploads arrive as a Uint8Array: a JS buffer proxy, or a memoryview/list of ints after to_py
+    # A proxy is copied out of JS memory once via to_bytes; a memoryview from to_py has already been
+    # copied, and bytes() copies it again. io.BytesIO then shares the bytes without a further copy
+    if hasattr(data, 'to_bytes'):
+        return data.to_bytes()
+    return bytes(data)
+
+# Patterns used by proper_case, compiled once
+_WORD_OR_SEP = re.compile(r'[a-zA-Z0-9]+|[^a-zA-Z0-9]+')
+_ALNUM_WORD = re.compile(r'[a-zA-Z0-9]+')
+_LETTERS_OR_DIGITS = re.compile(r'[a-zA-Z]+|[0-9]+')
+
+def case_letters(letters, preserve_upper):
+    # Casing rule for a run of letters
+    upper = letters.upper()
+    if upper in preserve_upper:
+        return upper
+    if len(letters) <= 2:
+        return letters  # preserve case
+    return letters.capitalize()
+
+def proper_case(text, preserve_upper=frozenset()):
     if not text:
         return ''
+    text = str(text).strip()
+    # Fast path: ASCII letter words separated by spaces need no regex split
+    if text.isascii() and text.replace(' ', '').isalpha():
+        return ' '.join(case_letters(word, preserve_upper) for word in text.split(' '))
     # Split into alphanum words and non-alphanum separators
-    parts = re.findall(r'[a-zA-Z0-9]+|[^a-zA-Z0-9]+', str(text).strip())
+    parts = _WORD_OR_SEP.findall(text)
     processed_parts = []
     for part in parts:
-        if re.match(r'^[a-zA-Z0-9]+$', part):  # word
+        if _ALNUM_WORD.fullmatch(part):  # word
             # Split into letter and digit subparts
-            subparts = re.findall(r'[a-zA-Z]+|[0-9]+', part)
-            processed_sub = []
-            for sub in subparts:
-                if sub.isdigit():
-                    processed_sub.append(sub)
-                else:  # letters
-                    upper_sub = sub.upper()
-                    if upper_sub in preserve_upper:
-                        processed_sub.append(upper_sub)
-                    elif len(sub) <= 2:
-                        processed_sub.append(sub)  # preserve case
-                    else:
-                        processed_sub.append(sub.capitalize())
-            processed_parts.append(''.join(processed_sub))
+            subparts = _LETTERS_OR_DIGITS.findall(part)
+            processed_parts.append(''.join(sub if sub.isdigit() else case_letters(sub, preserve_upper) for sub in subparts))
         else:  # separator
             processed_parts.append(part)
     return ''.join(processed_parts)
 
-def process_area(area, replacements):
-    # Processes area string with replacements and casing
-    if not area:
-        return ''
-    area = proper_case(area.strip().split()[0])
-    return replacements.get(area, area)
+# Cached normalizers: names repeat across invoice lines, so each distinct value is computed once
+# Results are interned so every row holding the same name shares one string object
+@lru_cache(maxsize=4096, typed=True)
+def case_customer(text):
+    return sys.intern(proper_case(text, ColumnConfig.preserve_upper_customer))
+
+@lru_cache(maxsize=4096, typed=True)
+def case_product(text):
+    return sys.intern(proper_case(text, ColumnConfig.preserve_upper_product))
+
+@lru_cache(maxsize=4096, typed=True)
+def case_area(word):
+    # Cases the first word of an area and expands known abbreviations
+    area = proper_case(word)
+    return sys.intern(ColumnConfig.area_replacements.get(area, area))
+
+# Section: File Parsing
+# Parses each uploaded file once; validation and extraction share the parsed frame
+def parse_file(buffer, filename, config):
+    # Reads only the used column span (B-K)
+    # Columns keep their absolute zero-based index as label (B -> 1), whatever the sheet width
+    used_idxs = (*config.extract_idxs, config.validation_idx)
+    first_idx, last_idx = min(used_idxs), max(used_idxs)
+    columns = range(first_idx, last_idx + 1)
+    if filename.endswith('.xls'):
+        # dtype=object keeps the raw cell values; typing happens per section below
+        df = pd.read_excel(buffer, header=None, engine='xlrd', dtype=object, usecols=lambda c: first_idx <= c <= last_idx)
+        rows = df.reindex(columns=columns).values.tolist()
+    else:
+        rows = read_xlsx(buffer, first_idx, last_idx)
+    return type_rows(rows, columns)
+
+def read_xlsx(buffer, first_idx, last_idx):
+    # Streams the first sheet in one read-only pass; cells come out the way pd.read_excel sees them:
+    # empty cells as '' and error cells as NaN
+    wb = load_workbook(buffer, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()  # Stored dimensions can be wrong; read every row instead
+        return [['' if cell.value is None else float('nan') if cell.data_type == 'e' else cell.value for cell in row] for row in ws.iter_rows(min_col=first_idx + 1, max_col=last_idx + 1)]
+    finally:
+        wb.close()
+
+def type_rows(rows, columns):
+    # Types raw rows with pandas' TextParser, as pd.read_excel does ('00123' reads as 123)
+    # Header rows 1-3 and data rows are typed separately, as the data was once read with skiprows=3,
+    # so blank headers cannot turn a data column of TRUE/5 into 1.0/5.0
+    parts = []
+    for section in (rows[:3], rows[3:]):
+        if section:
+            part = TextParser(section, header=None).read().astype(object)
+            part.columns = columns
+            parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(parts, ignore_index=True)
 
 # Section: Structure Validation
 # Validates input file structure for blanks in validation column
-def validate_structure(buffer, filename, config):
-    # Checks if specified validation cells are blank
-    engine = 'xlrd' if filename.endswith('.xls') else 'openpyxl'
-    df = pd.read_excel(buffer, header=None, engine=engine)
-    validation_idx = col_to_index(config.validation_column)
-    if validation_idx >= df.shape[1]:
+def validate_structure(df, config):
+    # Checks if specified validation cells (rows 4-6) are blank
+    if config.validation_idx not in df.columns:
         return True  # Column doesn't exist, treat as valid
-    cells = [df.iloc[3, validation_idx], df.iloc[4, validation_idx], df.iloc[5, validation_idx]]
+    cells = df[config.validation_idx].iloc[3:6]
     return all(pd.isna(cell) or str(cell).strip() == '' for cell in cells)
 
-# Section: Date Validation
-# Validates extracted dates are proper datetime
-def validate_dates(data):
-    # Checks if all dates in extracted data are valid datetime
-    for row in data:
-        date_val = row.get('date')
-        if date_val and not isinstance(date_val, datetime):
-            # Try force convert if str or num
-            try:
-                if isinstance(date_val, (str, int, float)):
-                    pd.to_datetime(date_val)
-                else:
-                    return False
-            except:
-                return False
-    return True
-
 # Section: Data Extraction
 # Extracts relevant data from input file
-def extract_data(buffer, filename, config):
-    # Reads and extracts data rows based on config, handling date conversion
-    engine = 'xlrd' if filename.endswith('.xls') else 'openpyxl'
-    df = pd.read_excel(buffer, header=None, engine=engine, skiprows=3)
-    main_idx = col_to_index(config.main_column)
-    extract_idxs = [col_to_index(col) for col in config.extract_columns]
-    data = []
-    for _, row in df.iterrows():
-        if pd.isna(row[main_idx]) or str(row[main_idx]).strip() == '':
-            continue
-        row_data = {}
-        for i, col in enumerate(config.extract_columns):
-            val = row[extract_idxs[i]]
-            if pd.isna(val):
-                val = ''
-            elif col == 'H':
-                try:
-                    val = float(val)
-                except:
-                    val = ''
-            elif col == 'I':
-                try:
-                    val = float(val)
-                except:
-                    val = ''
-            elif col == 'C':
-                if isinstance(val, (str, int, float)):
-                    try:
-                        val = pd.to_datetime(val)
-                    except:
-                        val = val  # Keep original if fail, validate later
-            elif col == 'D':
-                val = str(val).rstrip('.0') if isinstance(val, float) else str(val)  # Force str, remove .0
-            row_data[config.key_map[col]] = val
-        data.append(row_data)
-    return data
+def format_invoice(raw):
+    # Forces invoice numbers to str; whole-number cells print as integers (1200.0 -> '1200'),
+    # text and fractional numbers keep their str() form
+    # numbers.Real also covers numpy scalars from the pandas readers; bools stay text
+    is_num = raw.map(lambda v: isinstance(v, numbers.Real) and not isinstance(v, bool)).astype(bool) & raw.notna()
+    nums = pd.to_numeric(raw.where(is_num), errors='coerce')
+    whole = nums.notna() & (nums % 1 == 0)
+    # Int64 only holds magnitudes below 2**63; larger whole numbers are formatted one by one
+    fits = whole & (nums.abs() < 2 ** 63)
+    invoices = raw.astype('string').mask(fits, nums.where(fits).astype('Int64').astype('string'))
+    big = whole & ~fits
+    if big.any():
+        invoices = invoices.mask(big, raw[big].map(lambda v: str(int(v))).astype('string'))
+    return invoices
+
+def extract_data(df, config):
+    # Extracts data rows (from row 4) based on config, coercing typed columns up front
+    # Returns (frame, dates_valid); dates_valid is False if any non-blank date failed to convert
+    main_pos = config.extract_idxs.index(config.main_idx)
+    sub = df[list(config.extract_idxs)].iloc[3:]
+    main_col = sub.iloc[:, main_pos]
+    sub = sub[main_col.notna() & (main_col.astype(str).str.strip() != '')].copy()
+    dates_valid = True
+    for pos, col in enumerate(config.extract_columns):
+        raw = sub.iloc[:, pos]
+        if col in ('H', 'I'):
+            # Unparseable numbers become NaN
+            sub.isetitem(pos, pd.to_numeric(raw, errors='coerce'))
+        elif col == 'C':
+            dates = pd.to_datetime(raw, errors='coerce', format='mixed')
+            blank = raw.isna() | (raw.astype(str).str.strip() == '')
+            dates_valid = bool((dates.notna() | blank).all())
+            sub.isetitem(pos, dates)
+        elif col == 'D':
+            sub.isetitem(pos, format_invoice(raw))
+    # Blanks are filled column-wise; the frame stays columnar, labelled by data key, until process_data
+    frame = sub.astype(object).where(sub.notna(), '')
+    frame.columns = config.extract_keys
+    return frame, dates_valid
 
 # Section: Data Processing
 # Normalizes and processes extracted data
-def process_data(combined_data, config):
-    # Applies normalization and collects unique periods
-    periods = set()
-    for row in combined_data:
-        row['area'] = process_area(row['area'], config.area_replacements)
-        row['customer_name'] = proper_case(row['customer_name'], config.preserve_upper_customer)
-        row['product_name'] = proper_case(row['product_name'], config.preserve_upper_product)
-        date_value = row.get('date')
-        if date_value and isinstance(date_value, datetime):
-            periods.add(date_value.strftime('%Y-%m'))
-        row['invoice_no'] = str(row['invoice_no']) if row.get('invoice_no') else ''
-        row['product_type'] = str(row['product_type']) if row.get('product_type') else ''
-        row['quantity'] = row['quantity'] if row.get('quantity') else ''
-        row['unit_price'] = row['unit_price'] if row.get('unit_price') else ''
-    combined_data = sorted(combined_data, key=lambda x: x.get('date') or datetime.min)
-    return sorted(list(periods)), combined_data
+def process_data(df, config):
+    # Applies normalization column-wise to the combined frame, collects unique periods, returns records
+    if df is None or df.empty:
+        return (), []
+    # Area keeps only its first word (string ops); the cached normalizers compute each distinct value once
+    first_words = df['area'].astype(str).str.split(n=1).str[0].fillna('')
+    df['area'] = first_words.map(case_area)
+    df['customer_name'] = df['customer_name'].map(case_customer)
+    df['product_name'] = df['product_name'].map(case_product)
+    # Blank dates coerce to NaT: excluded from periods, sorted first
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    # Dedupe as monthly periods first, so only the distinct months are formatted ('YYYY-MM')
+    periods = dates.dropna().dt.to_period('M').unique().astype(str).tolist()
+    for col in ('invoice_no', 'product_type'):
+        # Interned: both repeat across the lines of an invoice
+        df[col] = df[col].where(df[col].astype(bool), '').astype(str).map(sys.intern)
+    for col in ('quantity', 'unit_price'):
+        df[col] = df[col].where(df[col].astype(bool), '')
+    df = df.loc[dates.sort_values(na_position='first', kind='mergesort').index]
+    # Periods are sorted once here and passed on as a tuple; nothing downstream re-sorts them
+    return tuple(sorted(periods)), df.to_dict('records')
 
 # Section: Blank Check
 # Checks for blank required fields
@@ -213,39 +278,49 @@ def check_blanks(combined_data):
         'unit_price': 'I'
     }
     required_keys = list(key_to_col.keys())
-    for i, row in enumerate(combined_data, 1):
-        for key in required_keys:
-            if not row.get(key):
-                warnings.append(f"{key_to_col[key]}{i+1}")
+    if not combined_data:
+        return warnings
+    # process_data leaves every blank field as '', so one mask covers all of them
+    df = pd.DataFrame(combined_data, columns=required_keys)
+    mask = (df.eq('') | df.isna()).to_numpy()
+    rows, cols = mask.nonzero()  # row-major, same order as a row-by-row scan
+    cols_letters = [key_to_col[key] for key in required_keys]
+    warnings.extend(f"{cols_letters[c]}{r + 2}" for r, c in zip(rows.tolist(), cols.tolist()))
     return warnings
 
 # Section: Table Generation
-# General function to generate Excel table from 2D data
-def generate_table(sheet, headers, data_2d, table_name, col_formats=None, row_formulas=None, start_row=1, start_col=1):
-    # Writes headers and data to sheet, applies formats/formulas, creates table
-    for rel_c, header in enumerate(headers, 1):
-        c = start_col + rel_c - 1
-        sheet.cell(start_row, c).value = header
-    for r_idx, row_data in enumerate(data_2d, 0):
-        r = start_row + r_idx + 1
-        for rel_c, val in enumerate(row_data, 1):
-            c = start_col + rel_c - 1
-            sheet.cell(r, c).value = val
-            if col_formats and rel_c in col_formats:
-                sheet.cell(r, c).number_format = col_formats[rel_c]
-        if row_formulas and row_formulas.get(r_idx):
-            for rel_col, formula in row_formulas[r_idx].items():
-                c = start_col + rel_col - 1
-                sheet.cell(r, c).value = formula
-                if col_formats and rel_col in col_formats:
-                    sheet.cell(r, c).number_format = col_formats[rel_col]
-    last_col = start_col + len(headers) - 1
-    last_row = start_row + len(data_2d)
-    ref = f"{get_column_letter(start_col)}{start_row}:{get_column_letter(last_col)}{last_row}"
+# General function to generate Excel table from pre-resolved rows
+def generate_table(sheet, headers, rows, table_name, col_formats=None, extra_headers=()):
+    # Appends header and data rows to a write-only sheet, applies formats, creates table
+    # Rows already carry their formulas; number formats are looked up positionally so a row is a single zip
+    # extra_headers label trailing columns the rows carry beyond the table; they are written but left outside it
+    all_headers = [*headers, *extra_headers]
+    formats = [None] * len(all_headers)
+    for rel_c, fmt in (col_formats or {}).items():
+        formats[rel_c - 1] = fmt
+    sheet.append(all_headers)
+    for row_data in rows:
+        sheet.append([styled_cell(sheet, val, fmt) if fmt else val for val, fmt in zip(row_data, formats)])
+    ref = f"A1:{get_column_letter(len(headers))}{len(rows) + 1}"
     tab = Table(displayName=table_name, ref=ref)
+    # Write-only sheets cannot be read back, so column names come from headers directly
+    tab.tableColumns = [TableColumn(id=i, name=header) for i, header in enumerate(headers, 1)]
     style = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False, showLastColumn=False, showRowStripes=True, showColumnStripes=False)
     tab.tableStyleInfo = style
-    sheet.add_table(tab)
+    with warnings.catch_warnings():
+        # openpyxl warns on every write-only add_table, even though the columns are set above
+        warnings.simplefilter('ignore', UserWarning)
+        sheet.add_table(tab)
+
+def styled_cell(sheet, value, fmt):
+    # New write-only cell carrying the column's number format
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.number_format = fmt
+    return cell
+
+# Helper: Excel array constant of area names, used as a SUMIFS criteria list
+def area_criteria(group):
+    return '{' + ','.join('"' + area.replace('"', '""') + '"' for area in group) + '}'
 
 # New: Sales Target Sheet Generation
 # Generates the Sales Target table using grouping and formulas
@@ -269,18 +344,6 @@ def generate_sales_target_sheet(wb, grouped_areas_ordered, period_months, config
     headers.append('Target - Qty Total')
     headers.append('Achieved - Qty Total')
 
-    # Prepare data rows (only groups that have at least one area)
-    data_2d = []
-    for group in grouped_areas_ordered:
-        if not group:
-            continue
-        label = ', '.join(group)
-        # Fill row with blanks; formulas will be applied later
-        num_cols = 1 + len(period_months) + 2 + 1 + len(period_months) + 2 + 1  # A + USD months + USD total + target + achieved + Qty months + Qty total + target + achieved
-        row = [''] * num_cols
-        row[0] = label
-        data_2d.append(row)
-
     # Column formats
     col_formats = {}
     col_formats[1] = '@'
@@ -308,48 +371,103 @@ def generate_sales_target_sheet(wb, grouped_areas_ordered, period_months, config
     col_formats[qty_target_col] = '#,##0'
     col_formats[qty_achieved_col] = '0%'
 
-    # Row formulas
-    row_formulas = {}
+    # Cumulative % per month (USD then Qty) in hidden columns right of the table, feeding the charts
+    cp_start = qty_achieved_col + 1
+    cp_end = cp_start + 2 * len(period_months) - 1
+    cp_headers = [header.replace('Sales - ', 'Cumulative - ', 1) for header in headers[usd_start - 1:usd_end] + headers[qty_start - 1:qty_end]]
+    for col in range(cp_start, cp_end + 1):
+        col_formats[col] = '0%'
+    if period_months:
+        # Write-only sheets emit column settings with the first row, so hide them before any append
+        sheet.column_dimensions.group(get_column_letter(cp_start), get_column_letter(cp_end), hidden=True, outline_level=1)
+
+    # Data rows (only groups that have at least one area), formulas resolved per row
+    rows = []
     for r_idx, group in enumerate([g for g in grouped_areas_ordered if g]):
         r = r_idx + 2
+        row = [', '.join(group)]
+        # One SUMIFS per month, matching every area in the group via an array constant
+        areas = area_criteria(group)
         # Monthly USD
-        for mi, (y, m) in enumerate(period_months):
-            c = usd_start + mi
+        for (y, m) in period_months:
             date_str = f'DATE({int(y)},{int(m)},1)'
-            # SUM of SUMIFS across areas in the group
-            inner = ','.join([f'SUMIFS(Sales_Data[Total (USD)], Sales_Data[Area], "{area}", Sales_Data[Periode], {date_str})' for area in group])
-            formula = f'=SUM({inner})' if inner else '=""'
-            row_formulas.setdefault(r_idx, {})[c] = formula
+            row.append(f'=SUM(SUMIFS(Sales_Data[Total (USD)], Sales_Data[Area], {areas}, Sales_Data[Periode], {date_str}))')
         # USD total
         sum_range = f'{get_column_letter(usd_start)}{r}:{get_column_letter(usd_end)}{r}' if len(period_months) > 0 else ''
-        row_formulas.setdefault(r_idx, {})[usd_total_col] = f'=SUM({sum_range})' if sum_range else '=""'
-        # USD target left blank (we will leave empty; formatting applied). If formatting of empty not retained, user can input. No default value here.
+        row.append(f'=SUM({sum_range})' if sum_range else '=""')
+        # USD target left blank for user input; formatting still applied
+        row.append('')
         # Achieved USD
-        row_formulas.setdefault(r_idx, {})[usd_achieved_col] = f'=IFERROR({get_column_letter(usd_total_col)}{r}/{get_column_letter(usd_target_col)}{r},0)'
+        row.append(f'=IFERROR({get_column_letter(usd_total_col)}{r}/{get_column_letter(usd_target_col)}{r},0)')
 
         # Monthly Qty
-        for mi, (y, m) in enumerate(period_months):
-            c = qty_start + mi
+        for (y, m) in period_months:
             date_str = f'DATE({int(y)},{int(m)},1)'
-            inner = ','.join([f'SUMIFS(Sales_Data[Jumlah], Sales_Data[Area], "{area}", Sales_Data[Periode], {date_str})' for area in group])
-            formula = f'=SUM({inner})' if inner else '=""'
-            row_formulas.setdefault(r_idx, {})[c] = formula
+            row.append(f'=SUM(SUMIFS(Sales_Data[Jumlah], Sales_Data[Area], {areas}, Sales_Data[Periode], {date_str}))')
         # Qty total
         sum_range_qty = f'{get_column_letter(qty_start)}{r}:{get_column_letter(qty_end)}{r}' if len(period_months) > 0 else ''
-        row_formulas.setdefault(r_idx, {})[qty_total_col] = f'=SUM({sum_range_qty})' if sum_range_qty else '=""'
+        row.append(f'=SUM({sum_range_qty})' if sum_range_qty else '=""')
+        # Qty target left blank for user input
+        row.append('')
         # Achieved Qty
-        row_formulas.setdefault(r_idx, {})[qty_achieved_col] = f'=IFERROR({get_column_letter(qty_total_col)}{r}/{get_column_letter(qty_target_col)}{r},0)'
+        row.append(f'=IFERROR({get_column_letter(qty_total_col)}{r}/{get_column_letter(qty_target_col)}{r},0)')
 
-    generate_table(sheet, headers, data_2d, 'Sales_Target', col_formats, row_formulas)
+        # Cumulative %: running monthly total over the row's target, which the user fills in
+        for start, target_col in ((usd_start, usd_target_col), (qty_start, qty_target_col)):
+            for mi in range(len(period_months)):
+                row.append(f'=IFERROR(SUM({get_column_letter(start)}{r}:{get_column_letter(start + mi)}{r})/{get_column_letter(target_col)}{r},0)')
+        rows.append(row)
 
-# Helper: Build period months list from sorted_periods (YYYY-MM)
+    generate_table(sheet, headers, rows, 'Sales_Target', col_formats, cp_headers)
+    return sheet, cp_start
+
+# Helper: Build period months list from sorted_periods (YYYY-MM, already in order)
 def build_period_months(sorted_periods):
-    months = []
-    for p in sorted(sorted_periods):
-        y = int(p[:4])
-        m = int(p[5:])
-        months.append((y, m))
-    return months
+    return [(int(p[:4]), int(p[5:7])) for p in sorted_periods]
+
+# Section: File Loading
+# Runs the per-file pipeline over one upload
+def load_all(payloads, config):
+    # Returns (sorted_periods, combined_data, invalid_files, invalid_date_files)
+    invalid_files = []
+    invalid_date_files = []
+    frames = []
+    for name, data in payloads:
+        df = parse_file(io.BytesIO(data), name, config)
+        if not validate_structure(df, config):
+            invalid_files.append(name)
+            continue
+        frame, dates_valid = extract_data(df, config)
+        if not dates_valid:
+            invalid_date_files.append(name)
+            continue
+        frames.append(frame)
+    if invalid_files or invalid_date_files:
+        return (), [], invalid_files, invalid_date_files
+    # One concat of the per-file frames instead of growing a list of row dicts
+    combined = pd.concat(frames, ignore_index=True) if frames else None
+    sorted_periods, combined_data = process_data(combined, config)
+    return sorted_periods, combined_data, invalid_files, invalid_date_files
+
+# Section: Prepared State
+# Result of the last successful prepare_files, reused by finalize_files for the same upload
+_LAST_PREPARED = {'key': None, 'result': None, 'periods': None, 'data': None}
+
+def clear_prepared():
+    # Drops the prepared state so stale data can never be finalized
+    _LAST_PREPARED.update(key=None, result=None, periods=None, data=None)
+
+def upload_key(payloads):
+    # Hashes the names and bytes of every file in one upload; each field is length-prefixed
+    # so different name/data splits of the same byte stream cannot collide
+    digest = hashlib.blake2b(digest_size=16)
+    for name, data in payloads:
+        name_bytes = name.encode()
+        digest.update(len(name_bytes).to_bytes(8, 'little'))
+        digest.update(name_bytes)
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.hexdigest()
 
 # Section: Main Processing Functions
 # We split into prepare (no workbook) and finalize (creates workbook)
@@ -357,6 +475,7 @@ def build_period_months(sorted_periods):
 def prepare_files(file_datas):
     message_div = document.getElementById('message')
     message_div.innerHTML = ''
+    clear_prepared()
 
     file_datas = file_datas.to_py()
     if not file_datas:
@@ -364,23 +483,10 @@ def prepare_files(file_datas):
         message_div.innerHTML = message
         return {'message': message, 'type': 'error'}
 
-    config = ColumnConfig()
-    invalid_files = []
-    invalid_date_files = []
-    combined_data = []
-
-    for f in file_datas:
-        name = f['name']
-        buffer = io.BytesIO(bytes(f['data']))
-        if not validate_structure(buffer, name, config):
-            invalid_files.append(name)
-            continue
-        buffer.seek(0)
-        data = extract_data(buffer, name, config)
-        if not validate_dates(data):
-            invalid_date_files.append(name)
-            continue
-        combined_data.extend(data)
+    config = CONFIG
+    payloads = [(f['name'], file_bytes(f['data'])) for f in file_datas]
+    key = upload_key(payloads)
+    sorted_periods, combined_data, invalid_files, invalid_date_files = load_all(payloads, config)
 
     msg = ''
     if invalid_files:
@@ -393,65 +499,48 @@ def prepare_files(file_datas):
         message_div.innerHTML = msg
         return {'message': msg, 'type': 'error'}
 
-    sorted_periods, combined_data = process_data(combined_data, config)
     blank_cells = check_blanks(combined_data)
 
-    # Collect unique areas (bench)
-    areas = []
-    seen = set()
-    for row in combined_data:
-        a = row.get('area')
-        if a and a not in seen:
-            seen.add(a)
-            areas.append(a)
+    # Collect unique areas (bench), first-seen order
+    areas = list(dict.fromkeys(row['area'] for row in combined_data if row.get('area')))
 
-    years = sorted(set(p[:4] for p in sorted_periods))
+    years = sorted({p[:4] for p in sorted_periods})
     multi_year = len(years) > 1
 
-    # Return minimal info to build UI
-    return {
+    # Return minimal info to build UI; keep the processed data for finalize_files
+    result = {
         'message': 'Ready for confirmation',
         'type': 'success',
         'areas': areas,
-        'periods': sorted_periods,
+        'periods': list(sorted_periods),
         'years': years,
         'multi_year': multi_year,
         'blank_cells': blank_cells,
+        'cache_key': key,  # Opaque; handed back to finalize_files so it can skip hashing
     }
-
-
-def finalize_files(file_datas, grouping, proceed_multi_year):
-    # Statelessly rebuild combined_data and then create workbook
-    prep = prepare_files(file_datas)
-    if prep.get('type') == 'error':
-        return prep
+    _LAST_PREPARED.update(key=key, result=result, periods=sorted_periods, data=combined_data)
+    return result
+
+
+def finalize_files(file_datas, grouping, proceed_multi_year, cache_key=None):
+    # Reuse the data prepared for this upload, recomputing only on a cache miss, then create workbook
+    key = cache_key or upload_key([(f['name'], file_bytes(f['data'])) for f in file_datas.to_py()])
+    if _LAST_PREPARED['key'] != key:
+        prep = prepare_files(file_datas)
+        if prep.get('type') == 'error':
+            return prep
+    prep = _LAST_PREPARED['result']
+    sorted_periods = _LAST_PREPARED['periods']
+    combined_data = _LAST_PREPARED['data']
     if prep.get('multi_year') and not proceed_multi_year:
         return {'message': 'Multiple years detected. Processing cancelled by user.', 'type': 'error'}
 
-    config = ColumnConfig()
-
-    # Rebuild combined_data again
-    file_datas = file_datas.to_py()
-    combined_data = []
-    for f in file_datas:
-        name = f['name']
-        buffer = io.BytesIO(bytes(f['data']))
-        if not validate_structure(buffer, name, config):
-            continue
-        buffer.seek(0)
-        data = extract_data(buffer, name, config)
-        if not validate_dates(data):
-            continue
-        combined_data.extend(data)
-    sorted_periods, combined_data = process_data(combined_data, config)
+    config = CONFIG
 
-    wb = Workbook()
+    wb = Workbook(write_only=True)
 
     # Sheet 1: Sales Data
-    sheet1 = wb.active
-    sheet1.title = 'Sales Data'
-    sales_data_2d = []
-    sales_row_formulas = {}
+    sheet1 = wb.create_sheet('Sales Data')
     sales_col_formats = {
         1: '@',
         2: 'dd/mm/yyyy',
@@ -466,16 +555,30 @@ def finalize_files(file_datas, grouping, proceed_multi_year):
         11: config.idr_format_0,
         12: config.usd_format_2
     }
-    for i, row in enumerate(combined_data):
-        date_value = row.get('date') if isinstance(row.get('date'), datetime) else ''
-        sales_data_2d.append([row['area'], date_value, '', row['invoice_no'], row['customer_name'], row['product_type'], row['product_name'], row['quantity'], row['unit_price'], '', '', ''])
-        sales_row_formulas[i] = {
-            3: f'=DATE(YEAR(B{i+2}), MONTH(B{i+2}), 1)',
-            10: f'=PRODUCT(H{i+2},I{i+2})',
-            11: f'=VLOOKUP(TEXT(C{i+2}, "YYYY-MM"), \'Exchange Rate\'!A:B, 2, FALSE)',
-            12: f'=J{i+2}/K{i+2}'
-        }
-    generate_table(sheet1, config.output_headers, sales_data_2d, "Sales_Data", sales_col_formats, sales_row_formulas)
+    # Pull each row's fields in one itemgetter call and unpack them positionally
+    row_fields = itemgetter('area', 'date', 'invoice_no', 'customer_name', 'product_type', 'product_name', 'quantity', 'unit_price')
+    # Periode and Total (IDR) are written as values when their inputs are present; rows with a blank
+    # input keep the formula so it picks up what the user fills in. Kurs and Total (USD) stay formulas.
+    numeric = (int, float)
+    sales_rows = [
+        [
+            area,
+            date if isinstance(date, datetime) else '',
+            datetime(date.year, date.month, 1) if isinstance(date, datetime) else f'=DATE(YEAR(B{r}), MONTH(B{r}), 1)',
+            invoice_no,
+            customer_name,
+            product_type,
+            product_name,
+            quantity,
+            unit_price,
+            quantity * unit_price if isinstance(quantity, numeric) and isinstance(unit_price, numeric) else f'=PRODUCT(H{r},I{r})',
+            f'=VLOOKUP(TEXT(C{r}, "YYYY-MM"), \'Exchange Rate\'!A:B, 2, FALSE)',
+            f'=J{r}/K{r}'
+        ]
+        for r, (area, date, invoice_no, customer_name, product_type, product_name, quantity, unit_price)
+        in enumerate(map(row_fields, combined_data), 2)
+    ]
+    generate_table(sheet1, config.output_headers, sales_rows, "Sales_Data", sales_col_formats)
 
     # Sheet 2: Exchange Rate
     sheet2 = wb.create_sheet('Exchange Rate')
@@ -494,103 +597,15 @@ def finalize_files(file_datas, grouping, proceed_multi_year):
         g = [a for a in grp if a]
         if g:
             groups_filtered.append(g)
-    generate_sales_target_sheet(wb, groups_filtered, period_months, config)
+    sheet3, cp_start = generate_sales_target_sheet(wb, groups_filtered, period_months, config)
 
-    # Sheet 4: Cumulative Percentage based on Sales Target
-    # Recompute the same column indexing logic used in generate_sales_target_sheet
+    # Charts plot the hidden cumulative % columns of Sales Target: USD months, then Qty months
     n_months = len(period_months)
-    usd_start = 2
-    usd_end = usd_start + n_months - 1
-    usd_total_col = usd_end + 1
-    usd_target_col = usd_total_col + 1
-    usd_achieved_col = usd_target_col + 1
-
-    qty_start = usd_achieved_col + 1
-    qty_end = qty_start + n_months - 1
-    qty_total_col = qty_end + 1
-    qty_target_col = qty_total_col + 1
-    qty_achieved_col = qty_target_col + 1
-
-    # Create sheet for cumulative percentages
-    sheet4 = wb.create_sheet('Cumulative Percentage')
-
-    # Build headers: Area, then Sales - USD MMM YY (for each period), then Sales - Qty MMM YY (for each period)
-    headers_cp = ['Area']
-    for (y, m) in period_months:
-        label = datetime(int(y), int(m), 1).strftime('%b %y')
-        headers_cp.append(f'Sales - USD {label}')
-    for (y, m) in period_months:
-        label = datetime(int(y), int(m), 1).strftime('%b %y')
-        headers_cp.append(f'Sales - Qty {label}')
-
-    # Prepare empty data rows (formulas will be applied per row)
-    data_2d_cp = []
-    for group in groups_filtered:
-        # Table uses group label same as Sales Target (A = ', '.join(group))
-        data_2d_cp.append([', '.join(group)] + [''] * (2 * n_months))
-
-    # Build row_formulas for each data row: cumulative sums divided by target columns in Sales Target
-    row_formulas_cp = {}
-    for r_idx, group in enumerate(groups_filtered):
-        # Row index in sheet4 (1-based header row at 1): data rows start at row 2
-        row_spreadsheet = r_idx + 2
-
-        # Corresponding row in Sales Target is the same row index (Sales Target table also starts at row 1 with header)
-        sales_row = row_spreadsheet
-
-        # USD cumulative formulas
-        for mi in range(n_months):
-            # cumulative columns in Sales Target: usd_start .. (usd_start + mi)
-            left_col_letter = get_column_letter(usd_start)
-            right_col_letter = get_column_letter(usd_start + mi)
-            target_col_letter = get_column_letter(usd_target_col)
-            # Build Excel SUM range for the Sales Target row
-            sum_range = f"'Sales Target'!{left_col_letter}{sales_row}:{right_col_letter}{sales_row}"
-            # Formula: =IFERROR(SUM(range)/'Sales Target'!TargetCell,0)
-            formula = f"=IFERROR(SUM({sum_range})/'Sales Target'!{target_col_letter}{sales_row},0)"
-            # Place this formula in sheet4 at relative column (2 + mi)
-            row_formulas_cp.setdefault(r_idx, {})[1 + mi + 1] = formula  # +1 because headers start at col1 (Area)
-
-        # Qty cumulative formulas (placed after USD columns)
-        for mi in range(n_months):
-            left_q_col = qty_start
-            right_q_col = qty_start + mi
-            left_q_letter = get_column_letter(left_q_col)
-            right_q_letter = get_column_letter(right_q_col)
-            qty_target_letter = get_column_letter(qty_target_col)
-            sum_range_q = f"'Sales Target'!{left_q_letter}{sales_row}:{right_q_letter}{sales_row}"
-            formula_q = f"=IFERROR(SUM({sum_range_q})/'Sales Target'!{qty_target_letter}{sales_row},0)"
-            # relative column index for qty = 1 (area) + n_months + (mi+1)
-            rel_col = 1 + n_months + (mi + 1)
-            row_formulas_cp.setdefault(r_idx, {})[rel_col] = formula_q
-
-    # Column formats: USD and Qty cumulative as percentage with 0 decimals
-    col_formats_cp = {}
-    # Area as text
-    col_formats_cp[1] = '@'
-    # USD cumulative columns (relative columns 2..1+n_months)
-    for rel in range(2, 2 + n_months):
-        col_formats_cp[rel] = '0%'
-    # Qty cumulative columns
-    for rel in range(2 + n_months, 2 + 2 * n_months):
-        col_formats_cp[rel] = '0%'
-
-    # Create the table
-    generate_table(sheet4, headers_cp, data_2d_cp, 'Cumulative_Percentage', col_formats_cp, row_formulas_cp)
-
-    # Very hide sheet4
-    sheet4.sheet_state = 'veryHidden'
-
-    sheet3 = wb['Sales Target']
-    sheet4 = wb['Cumulative Percentage']  # Reverted to original name with space
-
-    num_data_rows = len([g for g in groups_filtered if g])
+    group_labels = [', '.join(group) for group in groups_filtered]
+    num_data_rows = len(group_labels)
     chart_row = 1 + num_data_rows + 2  # header + data + one blank
 
     if n_months > 0 and num_data_rows > 0:
-        for r in range(1, min(6, sheet4.max_row + 1)):
-            row_vals = [sheet4.cell(row=r, column=c).value for c in range(1, min(sheet4.max_column + 1, 10))]
-
         try:
             # --- USD Chart ---
             usd_chart = ScatterChart()
@@ -611,24 +626,24 @@ def finalize_files(file_datas, grouping, proceed_multi_year):
             usd_chart.y_axis.title = 'Cumulative %'
             usd_chart.x_axis.delete = False
             usd_chart.y_axis.delete = False
+            usd_chart.visible_cells_only = False  # Source columns are hidden
 
-            # Categories: Month labels from headers (row 1, columns 2 to 1+n_months)
-            usd_cat = Reference(sheet4, min_col=2, min_row=1, max_col=1 + n_months, max_row=1)
+            # Categories: Month labels from the cumulative headers (row 1)
+            usd_cat = Reference(sheet3, min_col=cp_start, min_row=1, max_col=cp_start + n_months - 1, max_row=1)
 
             usd_series_count = 0
             for r_idx in range(num_data_rows):
                 data_row = 2 + r_idx
-                title_cell = sheet4.cell(row=data_row, column=1)
-                title_val = title_cell.value
+                title_val = group_labels[r_idx]
                 if not title_val:
                     continue
 
-                # Data range: same row, columns 2 to 1+n_months
+                # Data range: same row, USD cumulative columns
                 yref = Reference(
-                    sheet4,
-                    min_col=2,
+                    sheet3,
+                    min_col=cp_start,
                     min_row=data_row,
-                    max_col=1 + n_months,
+                    max_col=cp_start + n_months - 1,
                     max_row=data_row
                 )
 
@@ -670,21 +685,22 @@ def finalize_files(file_datas, grouping, proceed_multi_year):
             qty_chart.y_axis.title = 'Cumulative %'
             qty_chart.x_axis.delete = False
             qty_chart.y_axis.delete = False
+            qty_chart.visible_cells_only = False  # Source columns are hidden
 
-            qty_cat = Reference(sheet4, min_col=2 + n_months, min_row=1, max_col=1 + 2 * n_months, max_row=1)
+            qty_cat = Reference(sheet3, min_col=cp_start + n_months, min_row=1, max_col=cp_start + 2 * n_months - 1, max_row=1)
 
             qty_series_count = 0
             for r_idx in range(num_data_rows):
                 data_row = 2 + r_idx
-                title_val_q = sheet4.cell(row=data_row, column=1).value
+                title_val_q = group_labels[r_idx]
                 if not title_val_q:
                     continue
 
                 yref_q = Reference(
-                    sheet4,
-                    min_col=2 + n_months,
+                    sheet3,
+                    min_col=cp_start + n_months,
                     min_row=data_row,
-                    max_col=1 + 2 * n_months,
+                    max_col=cp_start + 2 * n_months - 1,
                     max_row=data_row
                 )
 
@@ -711,6 +727,9 @@ def finalize_files(file_datas, grouping, proceed_multi_year):
     output.seek(0)
     buffer = list(output.getvalue())
 
+    # Prepared data is no longer needed once the workbook is built
+    clear_prepared()
+
     blank_cells = prep.get('blank_cells', [])
     if blank_cells:
         msg = '<p>Processing complete. Warning: Please check these empty cells in the output:</p><ul>' + ''.join(f'<li>{c}</li>' for c in blank_cells) + '</ul>'